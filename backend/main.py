@@ -1,105 +1,415 @@
-import os
 import json
-import base64
 import asyncio
+import atexit
 import logging
+import queue
 import time
-from typing import AsyncGenerator, Optional
-from datetime import datetime, timedelta
-from collections import defaultdict
-from functools import wraps
+import hashlib
+import html
+import re
+import secrets
+import sys
+import tempfile
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, Awaitable, Callable, Optional
+from collections import defaultdict, deque
+from functools import lru_cache, wraps
+from logging.handlers import QueueHandler, QueueListener
 from dotenv import load_dotenv
+from cachetools import TTLCache
+from pydantic import BaseModel, TypeAdapter, ValidationError, field_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from fastapi import FastAPI, UploadFile, File, Query, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from sse_starlette.sse import EventSourceResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 
-from google.cloud import speech, translate_v2 as translate
+import google.auth
+from google.cloud import speech, translate_v3 as translate
+from google.cloud.speech_v1.services.speech.transports import SpeechGrpcAsyncIOTransport
+from google.cloud.translate_v3.services.translation_service.transports import (
+    TranslationServiceGrpcAsyncIOTransport,
+)
 from google.api_core import exceptions as google_exceptions
 import google.generativeai as genai
 import httpx
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+import orjson
+import pybase64
 
 # === Setup Logging ===
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line - Cloud Run picks up the severity/message fields"""
+    def format(self, record: logging.LogRecord) -> str:
+        return orjson.dumps({
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "severity": record.levelname,
+            "message": record.getMessage(),
+            "logger": record.name
+        }).decode()
+
+# Handlers only enqueue; a background thread does the actual stderr writes
+log_queue: queue.SimpleQueue = queue.SimpleQueue()
+log_stream = logging.StreamHandler()
+log_stream.setFormatter(JSONFormatter())
+log_listener = QueueListener(log_queue, log_stream)
+
+root_logger = logging.getLogger()
+root_logger.setLevel(logging.INFO)
+root_logger.handlers = [QueueHandler(log_queue)]  # replaced, not added - workers import this module twice
+log_listener.start()
+atexit.register(log_listener.stop)  # Flush whatever is still queued
+
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
-app = FastAPI(title="Language Mirror API", version="2.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Shared clients live for the whole process - see startup() and shutdown() below"""
+    await startup(app)
+    try:
+        yield
+    finally:
+        await shutdown(app)
+
+
+app = FastAPI(
+    title="Language Mirror API",
+    version="2.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
+
+# === Configuration ===
+class Settings(BaseSettings):
+    """Environment configuration - parsed and validated once at import"""
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+    
+    gemini_api_key: str = ""
+    elevenlabs_api_key: str = ""
+    google_cloud_project: str = ""
+    # Comma-separated frontend origins, e.g. "https://mirror.example.com,http://localhost:3000"
+    cors_origins: str = "*"
+    # Reverse proxies in front of the app that append to X-Forwarded-For (0 = trust no header)
+    trusted_proxy_hops: int = 0
+    # Attach tracebacks to error logs (formatting them is costly under an error storm)
+    log_tracebacks: bool = True
+    # Uvicorn worker processes. Caches, rate limits and /audio tokens are per process, so >1
+    # needs sticky sessions (an /audio fetch must reach the worker that served its /converse)
+    web_concurrency: int = 1
+    uvicorn_log_level: str = "warning"  # uvicorn's own logs; app logs stay at INFO
+    
+    # Response caches (TTLs in seconds)
+    stt_cache_size: int = 10_000
+    stt_cache_ttl: int = 3600
+    translate_cache_size: int = 10_000
+    translate_cache_ttl: int = 3600
+    detect_cache_size: int = 10_000
+    detect_cache_ttl: int = 3600
+    gemini_cache_size: int = 2000
+    gemini_cache_ttl: int = 600
+    greeting_cache_size: int = 64  # 15 personas, with and without audio
+    greeting_cache_ttl: int = 86_400
+    audio_store_size: int = 1000  # synthesized replies waiting to be fetched from /audio
+    audio_store_ttl: int = 300
+    
+    # Upstream calls allowed in flight at once, per provider (a stream holds its Speech slot until it ends)
+    speech_concurrency: int = 16
+    gemini_concurrency: int = 8
+    translate_concurrency: int = 16
+    tts_concurrency: int = 4
+    
+    @property
+    def cors_origin_list(self) -> list[str]:
+        return [origin.strip() for origin in self.cors_origins.split(",") if origin.strip()]
+
+
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
+
+
+settings = get_settings()
+# Built once; sent per request rather than set on the shared client so the key only ever goes to ElevenLabs
+ELEVENLABS_HEADERS = {"xi-api-key": settings.elevenlabs_api_key}
 
 # CORS for frontend
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=settings.cors_origin_list,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["content-type", "authorization"],
+    max_age=86400,  # Let browsers cache preflights for a day
 )
 
-# === Configuration ===
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
-GOOGLE_CLOUD_PROJECT = os.getenv("GOOGLE_CLOUD_PROJECT")
+
+class JSONGZipMiddleware:
+    """GZip for regular responses; SSE bypasses it (gzip holds events back) and so does MP3 (already compressed)"""
+    
+    def __init__(self, app, skip_prefixes: tuple[str, ...], **gzip_options):
+        self.app = app
+        self.gzip = GZipMiddleware(app, **gzip_options)
+        self.skip_prefixes = skip_prefixes
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not scope["path"].startswith(self.skip_prefixes):
+            await self.gzip(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+
+app.add_middleware(
+    JSONGZipMiddleware,
+    skip_prefixes=("/converse", "/audio/"),
+    minimum_size=1024,  # tiny bodies aren't worth the CPU
+    compresslevel=5,
+)
 
 # Rate Limiting Config
 RATE_LIMIT_REQUESTS = 20  # requests per window
 RATE_LIMIT_WINDOW = 60  # seconds
+# Per-route budgets so cheap endpoints can't drain the quota of expensive ones
+ROUTE_RATE_LIMITS = {
+    "/converse": (RATE_LIMIT_REQUESTS, RATE_LIMIT_WINDOW),  # Speech + Gemini + Translate + TTS
+    "/greeting": (60, RATE_LIMIT_WINDOW),  # Translate (+ optional TTS)
+}
+RATE_LIMIT_SWEEP_INTERVAL = RATE_LIMIT_WINDOW  # seconds between idle-client sweeps
+
+# Gemini Config - tried in order, lite models have higher free tier limits!
+GEMINI_MODELS = [
+    "gemini-2.0-flash-lite",      # Lite = higher free tier quota
+    "gemini-2.0-flash-lite-001",
+    "gemini-flash-lite-latest",
+    "gemini-2.0-flash",           # Regular flash
+    "gemini-2.0-flash-001",
+    "gemini-flash-latest",
+    "gemini-2.0-flash-exp",       # Experimental (strict limits)
+]
+GEMINI_GENERATION_CONFIG = genai.types.GenerationConfig(
+    temperature=0.8,
+    max_output_tokens=300,
+    response_mime_type="application/json",  # JSON mode - the system prompt carries the field list
+)
+# Model that answered last - tried first so an exhausted head of GEMINI_MODELS isn't re-probed every turn
+last_good_model: Optional[str] = None
+JSON_FENCE_PATTERN = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.DOTALL)  # ```json ... ``` wrapper
+
+# Conversation history Config
+MAX_HISTORY_TURNS = 2  # turns of context sent to Gemini
+MAX_HISTORY_CHARS = 500  # per message
+
+# Speech Config
+STT_STREAMING_THRESHOLD = 256 * 1024  # bytes - longer clips use streaming recognition
+STT_STREAM_CHUNK = 16 * 1024  # bytes per StreamingRecognizeRequest (Speech caps each message at ~25 KB)
+
+# SSE Config
+SSE_PING_INTERVAL = 15  # seconds between keepalive comments, under common proxy idle timeouts
+SSE_PARTIAL_INTERVAL = 0.05  # seconds - at most one partial transcript per window
+
+# Upload Config
+UPLOAD_CHUNK = 64 * 1024  # bytes copied per read
+AUDIO_SPOOL_MAX = 1024 * 1024  # uploads above this spill to a temp file instead of RAM
+MAX_AUDIO_BYTES = 10 * 1024 * 1024  # larger uploads are rejected with 413 (Speech's inline audio cap)
+
+# gRPC Channel Config
+GRPC_CHANNEL_OPTIONS = [
+    # Ping between learner turns too, so NATs/LBs don't drop idle channels. gRPC servers answer
+    # call-less pings more often than every 5 min with GOAWAY (too_many_pings), so stay just above.
+    ("grpc.keepalive_time_ms", 330_000),
+    ("grpc.keepalive_timeout_ms", 20_000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.max_send_message_length", -1),
+    ("grpc.max_receive_message_length", -1),
+]
+WARMUP_TIMEOUT = 5.0  # seconds; startup never waits longer than this on Google
 
 # === Rate Limiter ===
 class RateLimiter:
     def __init__(self, max_requests: int, window_seconds: int):
         self.max_requests = max_requests
         self.window = window_seconds
-        self.requests = defaultdict(list)
+        # Fixed-size ring per client: at most max_requests timestamps, oldest on the left
+        self.requests = defaultdict(lambda: deque(maxlen=self.max_requests))
     
     def is_allowed(self, client_ip: str) -> tuple[bool, Optional[int]]:
         now = time.time()
-        # Clean old requests
-        self.requests[client_ip] = [
-            req_time for req_time in self.requests[client_ip]
-            if now - req_time < self.window
-        ]
+        timestamps = self.requests[client_ip]
         
-        if len(self.requests[client_ip]) >= self.max_requests:
-            oldest = min(self.requests[client_ip])
-            retry_after = int(self.window - (now - oldest)) + 1
+        # A full ring whose oldest entry is still inside the window means the budget is spent
+        if len(timestamps) == self.max_requests and now - timestamps[0] < self.window:
+            retry_after = int(self.window - (now - timestamps[0])) + 1
             return False, retry_after
         
-        self.requests[client_ip].append(now)
+        timestamps.append(now)  # overwrites the oldest slot once the ring is full
         return True, None
+    
+    def sweep(self) -> int:
+        """Drop clients whose newest request has left the window - returns how many went"""
+        cutoff = time.time() - self.window
+        idle = [ip for ip, timestamps in self.requests.items() if not timestamps or timestamps[-1] < cutoff]
+        for ip in idle:
+            del self.requests[ip]
+        return len(idle)
 
 rate_limiter = RateLimiter(RATE_LIMIT_REQUESTS, RATE_LIMIT_WINDOW)
+route_rate_limiters = {
+    path: RateLimiter(max_requests, window)
+    for path, (max_requests, window) in ROUTE_RATE_LIMITS.items()
+}
 
-# === Initialize Clients (Connection Pooling) ===
-speech_client = None
-translate_client = None
-http_client = None
 
-@app.on_event("startup")
-async def startup():
-    global speech_client, translate_client, http_client
-    try:
-        speech_client = speech.SpeechClient()
-        translate_client = translate.Client()
-        http_client = httpx.AsyncClient(timeout=30.0)
+async def sweep_rate_limiters():
+    """Background task - without it every IP ever seen keeps a key forever"""
+    limiters = [rate_limiter, *route_rate_limiters.values()]
+    while True:
+        await asyncio.sleep(RATE_LIMIT_SWEEP_INTERVAL)
+        removed = sum(limiter.sweep() for limiter in limiters)
+        if removed:
+            logger.info(f"🧹 Pruned {removed} idle rate-limit entries")
+
+# === Response Cache ===
+_MISSING = object()
+
+class ResponseCache:
+    """TTL cache where concurrent misses for the same key share one upstream call - and its result,
+    so a failure reaches every caller already waiting instead of being retried once per caller"""
+    def __init__(self, maxsize: int, ttl: int):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.in_flight: dict[Any, asyncio.Task] = {}
+        self.waiters: dict[Any, int] = {}  # callers awaiting each in-flight fetch
+    
+    async def get_or_fetch(
+        self, key, fetch: Callable[[], Awaitable[tuple[Any, Optional[str]]]]
+    ) -> tuple[Any, Optional[str]]:
+        value = self.cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value, None
         
-        # Configure Gemini
-        genai.configure(api_key=GEMINI_API_KEY)
+        task = self.in_flight.get(key)
+        if task is None:
+            task = self.in_flight[key] = asyncio.create_task(self._fetch(key, fetch))
+            task.add_done_callback(lambda done: self._forget(key, done))
+        self.waiters[key] = self.waiters.get(key, 0) + 1
+        try:
+            # Shielded so one caller leaving doesn't cancel the fetch for the others
+            return await asyncio.shield(task)
+        finally:
+            self.waiters[key] -= 1
+            if not self.waiters[key]:
+                del self.waiters[key]
+                task.cancel()  # no-op once finished; stops upstream work nobody is waiting for
+    
+    async def _fetch(self, key, fetch) -> tuple[Any, Optional[str]]:
+        value, error = await fetch()
+        if error is None:  # Never cache failures - the next caller after this one retries
+            self.cache[key] = value
+        return value, error
+    
+    def _forget(self, key, task: asyncio.Task):
+        # Runs even if the task was cancelled before it started
+        if self.in_flight.get(key) is task:
+            del self.in_flight[key]
+    
+    def get(self, key, default=None):
+        return self.cache.get(key, default)
+    
+    def set(self, key, value):
+        self.cache[key] = value
+
+stt_cache = ResponseCache(settings.stt_cache_size, settings.stt_cache_ttl)
+translate_cache = ResponseCache(settings.translate_cache_size, settings.translate_cache_ttl)
+detect_cache = ResponseCache(settings.detect_cache_size, settings.detect_cache_ttl)
+gemini_cache = ResponseCache(settings.gemini_cache_size, settings.gemini_cache_ttl)
+greeting_cache = ResponseCache(settings.greeting_cache_size, settings.greeting_cache_ttl)
+audio_store = TTLCache(maxsize=settings.audio_store_size, ttl=settings.audio_store_ttl)  # token -> MP3 bytes
+
+# Admission control - excess calls wait here instead of piling 429s onto the provider
+gemini_semaphore = asyncio.Semaphore(settings.gemini_concurrency)
+speech_semaphore = asyncio.Semaphore(settings.speech_concurrency)
+translate_semaphore = asyncio.Semaphore(settings.translate_concurrency)
+tts_semaphore = asyncio.Semaphore(settings.tts_concurrency)
+
+# === Initialize Clients (Connection Pooling) ===
+async def startup(app: FastAPI):
+    # One pooled HTTP/2 client shared by every outbound call (keeps TLS connections warm)
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=200, max_keepalive_connections=50, keepalive_expiry=30.0),
+        timeout=httpx.Timeout(30.0, connect=5.0)
+    )
+    app.state.rate_limit_sweeper = asyncio.create_task(sweep_rate_limiters())
+    
+    # Configure Gemini and build each model handle once (no network involved).
+    # The tutor prompt is bound as the system instruction, so every turn for a
+    # persona shares an identical prefix and only the conversation delta varies.
+    genai.configure(api_key=settings.gemini_api_key)
+    app.state.gemini_models = {
+        (name, language, dialect): genai.GenerativeModel(
+            name,
+            generation_config=GEMINI_GENERATION_CONFIG,
+            system_instruction=get_tutor_prompt(language, dialect),
+        )
+        for name in GEMINI_MODELS
+        for language, lang_config in SUPPORTED_LANGUAGES.items()
+        for dialect in lang_config["dialects"]
+    }
+    
+    # Translate v3 needs a project in every parent path; fall back to the credentials' own project
+    project = settings.google_cloud_project
+    app.state.translate_parent = f"projects/{project}/locations/global"
+    
+    try:
+        # Native asyncio gRPC clients so Google calls never block the event loop.
+        # Both share one credentials object, so a single OAuth token fetch serves both.
+        credentials, default_project = google.auth.default(scopes=["https://www.googleapis.com/auth/cloud-platform"])
+        project = project or default_project or ""
+        if not project:
+            logger.error("❌ No Google Cloud project - set GOOGLE_CLOUD_PROJECT or translation will fail")
+        app.state.translate_parent = f"projects/{project}/locations/global"
+        speech_channel = SpeechGrpcAsyncIOTransport.create_channel(
+            credentials=credentials, options=GRPC_CHANNEL_OPTIONS
+        )
+        translate_channel = TranslationServiceGrpcAsyncIOTransport.create_channel(
+            credentials=credentials, options=GRPC_CHANNEL_OPTIONS
+        )
+        app.state.speech = speech.SpeechAsyncClient(
+            transport=SpeechGrpcAsyncIOTransport(channel=speech_channel)
+        )
+        app.state.translate = translate.TranslationServiceAsyncClient(
+            transport=TranslationServiceGrpcAsyncIOTransport(channel=translate_channel)
+        )
         
         logger.info("✅ All clients initialized successfully")
     except Exception as e:
         logger.error(f"❌ Failed to initialize clients: {e}")
+        return
+    
+    try:
+        # Pay TLS + HTTP/2 + OAuth setup now instead of on the first user's turn
+        await asyncio.wait_for(
+            asyncio.gather(
+                speech_channel.channel_ready(),
+                app.state.translate.get_supported_languages(parent=app.state.translate_parent),
+            ),
+            timeout=WARMUP_TIMEOUT,
+        )
+        logger.info("🔥 Google channels warmed up")
+    except Exception as e:
+        logger.warning(f"⚠️ Google warmup skipped: {e}")
+
+async def shutdown(app: FastAPI):
+    app.state.rate_limit_sweeper.cancel()
+    await app.state.http.aclose()
+    logger.info("🔌 HTTP client closed")
 
-@app.on_event("shutdown")
-async def shutdown():
-    global http_client
-    if http_client:
-        await http_client.aclose()
-        logger.info("🔌 HTTP client closed")
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared outbound HTTP client created at startup"""
+    return app.state.http
 
 # === Language Configurations ===
 SUPPORTED_LANGUAGES = {
@@ -265,10 +575,83 @@ SUPPORTED_LANGUAGES = {
     }
 }
 
+# Default dialect key per language (the first one listed)
+_FIRST_DIALECT = {lang_key: next(iter(lang_config["dialects"])) for lang_key, lang_config in SUPPORTED_LANGUAGES.items()}
+
+# (language, dialect) -> (lang_config, dialect_config), built once. (language, "") holds the
+# language's default dialect, so fallbacks never rebuild a list of dialect configs.
+_LANG_DIALECT_CACHE: dict[tuple[str, str], tuple[dict, dict]] = {}
+for _lang_key, _lang_config in SUPPORTED_LANGUAGES.items():
+    _LANG_DIALECT_CACHE[(_lang_key, "")] = (_lang_config, next(iter(_lang_config["dialects"].values())))
+    for _dialect_key, _dialect_config in _lang_config["dialects"].items():
+        _LANG_DIALECT_CACHE[(_lang_key, _dialect_key)] = (_lang_config, _dialect_config)
+
+
+# Map of language codes to readable names (for wrong-language messages)
+_LANGUAGE_NAMES = {
+    "en": "English",
+    "it": "Italian",
+    "es": "Spanish",
+    "fr": "French",
+    "de": "German",
+    "ja": "Japanese",
+    "zh": "Chinese",
+    "zh-cn": "Chinese",
+    "zh-tw": "Chinese",
+    "ko": "Korean",
+    "pt": "Portuguese",
+    "ru": "Russian",
+    "ar": "Arabic",
+    "hi": "Hindi",
+    "nl": "Dutch",
+    "pl": "Polish",
+    "tr": "Turkish",
+    "vi": "Vietnamese",
+    "th": "Thai",
+    "sv": "Swedish",
+    "da": "Danish",
+    "no": "Norwegian",
+    "fi": "Finnish",
+    "el": "Greek",
+    "he": "Hebrew",
+    "id": "Indonesian",
+    "ms": "Malay",
+    "cs": "Czech",
+    "ro": "Romanian",
+    "hu": "Hungarian",
+    "uk": "Ukrainian",
+    "bg": "Bulgarian",
+    "hr": "Croatian",
+    "sk": "Slovak",
+    "sl": "Slovenian",
+    "lt": "Lithuanian",
+    "lv": "Latvian",
+    "et": "Estonian",
+    "und": "Unknown",
+    "": "Unknown"
+}
+
+# Base translate code per supported language ("zh-CN" -> "zh") for detection comparisons
+_TARGET_BASES = {
+    lang_key: lang_config["translate_code"].lower().split("-")[0]
+    for lang_key, lang_config in SUPPORTED_LANGUAGES.items()
+}
+
+
+def _resolve(language: str, dialect: str = "") -> tuple[dict, dict]:
+    """Language and dialect config - unknown languages fall back to Italian, unknown dialects to the first"""
+    return (
+        _LANG_DIALECT_CACHE.get((language, dialect))
+        or _LANG_DIALECT_CACHE.get((language, ""))
+        or _LANG_DIALECT_CACHE.get(("italian", dialect))
+        or _LANG_DIALECT_CACHE[("italian", "")]
+    )
+
+
 # === Humanistic Tutor System Prompt ===
+@lru_cache(maxsize=64)  # 15 personas; bounded since callers may pass arbitrary strings
 def get_tutor_prompt(language: str, dialect: str) -> str:
-    lang_config = SUPPORTED_LANGUAGES.get(language, SUPPORTED_LANGUAGES["italian"])
-    dialect_config = lang_config["dialects"].get(dialect, list(lang_config["dialects"].values())[0])
+    lang_config, dialect_config = _resolve(language, dialect)
     
     return f"""You are {dialect_config['name']}, a language tutor from {dialect_config['region']}.
 
@@ -320,23 +703,112 @@ RESPONSE FORMAT (JSON only):
 }}"""
 
 
+# === Google API Calls ===
+# Transient failures are retried with exponential backoff and full jitter, so clients
+# that failed together don't retry in lockstep. Only idempotent unary calls are wrapped,
+# and the SDK's own retry is disabled so this is the single policy.
+google_retry = retry(
+    retry=retry_if_exception_type((
+        google_exceptions.ResourceExhausted,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.DeadlineExceeded
+    )),
+    wait=wait_random_exponential(multiplier=0.2, max=8),
+    stop=stop_after_attempt(5),
+    reraise=True
+)
+
+
+@google_retry
+async def google_recognize(config: speech.RecognitionConfig, audio: speech.RecognitionAudio):
+    async with speech_semaphore:
+        return await app.state.speech.recognize(config=config, audio=audio, retry=None)
+
+
+@google_retry
+async def google_detect_language(text: str):
+    async with translate_semaphore:
+        return await app.state.translate.detect_language(
+            parent=app.state.translate_parent,
+            content=text,
+            mime_type="text/plain",
+            retry=None
+        )
+
+
+@google_retry
+async def google_translate(text: str, source_code: str, target_code: str):
+    async with translate_semaphore:
+        return await app.state.translate.translate_text(
+            parent=app.state.translate_parent,
+            contents=[text],
+            source_language_code=source_code,
+            target_language_code=target_code,
+            retry=None
+        )
+
+
 # === Helper Functions with Error Handling ===
 
-async def transcribe_audio(audio_content: bytes, language: str) -> tuple[str, Optional[str]]:
+def normalize_utterance(text: str) -> str:
+    """Case, punctuation and spacing-insensitive form of a transcript, for cache keys"""
+    return " ".join(re.sub(r"[^\w\s]", " ", text.casefold()).split())
+
+
+async def spool_upload(upload: UploadFile) -> tuple[tempfile.SpooledTemporaryFile, int, bytes]:
+    """Copy an upload into a spooled temp file in chunks, returning (file, size, sha256 digest)"""
+    too_large = HTTPException(status_code=413, detail=f"Audio too large (max {MAX_AUDIO_BYTES // (1024 * 1024)} MB)")
+    if upload.size is not None and upload.size > MAX_AUDIO_BYTES:
+        raise too_large  # known up front - don't copy a byte
+    
+    spool = tempfile.SpooledTemporaryFile(max_size=AUDIO_SPOOL_MAX)
+    digest = hashlib.sha256()
+    size = 0
+    while chunk := await upload.read(UPLOAD_CHUNK):
+        size += len(chunk)
+        if size > MAX_AUDIO_BYTES:
+            spool.close()
+            raise too_large
+        digest.update(chunk)
+        spool.write(chunk)
+    spool.seek(0)
+    return spool, size, digest.digest()
+
+
+async def transcribe_audio(audio_file, audio_digest: bytes, language: str) -> tuple[str, Optional[str]]:
+    """Google Speech-to-Text, cached by audio digest (the file is only read on a miss)"""
+    key = (audio_digest, language)
+    return await stt_cache.get_or_fetch(key, lambda: _transcribe_audio(audio_file.read(), language))
+
+
+def recognition_config(language: str) -> speech.RecognitionConfig:
+    lang_config, _ = _resolve(language)
+    return speech.RecognitionConfig(
+        encoding=speech.RecognitionConfig.AudioEncoding.WEBM_OPUS,
+        sample_rate_hertz=48000,
+        language_code=lang_config["code"],
+        enable_automatic_punctuation=True,
+        model="default"
+    )
+
+
+def speech_error_message(e: Exception) -> str:
+    """Map Speech API failures to user-facing messages"""
+    if isinstance(e, google_exceptions.InvalidArgument):
+        logger.error(f"Speech API invalid argument: {e}")
+        return "Audio format not supported. Please try again."
+    if isinstance(e, google_exceptions.ResourceExhausted):
+        logger.error(f"Speech API quota exceeded: {e}")
+        return "Service temporarily busy. Please wait a moment."
+    logger.error(f"Speech API error: {e}")
+    return f"Transcription failed: {str(e)}"
+
+
+async def _transcribe_audio(audio_content: bytes, language: str) -> tuple[str, Optional[str]]:
     """Google Speech-to-Text with error handling"""
     try:
-        lang_config = SUPPORTED_LANGUAGES.get(language, SUPPORTED_LANGUAGES["italian"])
-        
         audio = speech.RecognitionAudio(content=audio_content)
-        config = speech.RecognitionConfig(
-            encoding=speech.RecognitionConfig.AudioEncoding.WEBM_OPUS,
-            sample_rate_hertz=48000,
-            language_code=lang_config["code"],
-            enable_automatic_punctuation=True,
-            model="default"
-        )
-        
-        response = speech_client.recognize(config=config, audio=audio)
+        response = await google_recognize(recognition_config(language), audio)
         
         if not response.results:
             return "", "No speech detected. Please speak clearly and try again."
@@ -347,18 +819,127 @@ async def transcribe_audio(audio_content: bytes, language: str) -> tuple[str, Op
         logger.info(f"📝 Transcribed ({confidence:.0%} confidence): {transcript[:50]}...")
         return transcript, None
         
-    except google_exceptions.InvalidArgument as e:
-        logger.error(f"Speech API invalid argument: {e}")
-        return "", "Audio format not supported. Please try again."
-    except google_exceptions.ResourceExhausted as e:
-        logger.error(f"Speech API quota exceeded: {e}")
-        return "", "Service temporarily busy. Please wait a moment."
     except Exception as e:
-        logger.error(f"Speech API error: {e}")
-        return "", f"Transcription failed: {str(e)}"
+        return "", speech_error_message(e)
+
+
+async def stream_transcribe_audio(audio_file, audio_digest: bytes, language: str) -> AsyncGenerator[tuple[str, bool, Optional[str]], None]:
+    """
+    Google streaming Speech-to-Text for long clips.
+    Yields (partial_transcript, False, None) as results arrive, then exactly one
+    (transcript, True, error) with the full result.
+    """
+    key = (audio_digest, language)
+    cached = stt_cache.get(key)
+    if cached is not None:
+        yield cached, True, None
+        return
+    
+    streaming_config = speech.StreamingRecognitionConfig(
+        config=recognition_config(language),
+        interim_results=True
+    )
+    
+    async def requests() -> AsyncGenerator[speech.StreamingRecognizeRequest, None]:
+        yield speech.StreamingRecognizeRequest(streaming_config=streaming_config)
+        while chunk := audio_file.read(STT_STREAM_CHUNK):
+            yield speech.StreamingRecognizeRequest(audio_content=chunk)
+    
+    finals = []
+    try:
+        async with speech_semaphore:
+            responses = await app.state.speech.streaming_recognize(requests=requests())
+            async for response in responses:
+                for result in response.results:
+                    if not result.alternatives:
+                        continue
+                    if result.is_final:
+                        finals.append(result.alternatives[0].transcript.strip())
+                    else:
+                        yield " ".join(finals + [result.alternatives[0].transcript.strip()]), False, None
+    except Exception as e:
+        yield "", True, speech_error_message(e)
+        return
+    
+    transcript = " ".join(finals)
+    if not transcript:
+        yield "", True, "No speech detected. Please speak clearly and try again."
+        return
+    
+    logger.info(f"📝 Stream-transcribed: {transcript[:50]}...")
+    stt_cache.set(key, transcript)
+    yield transcript, True, None
 
 
-def detect_language_mismatch(transcript: str, target_language: str) -> tuple[bool, str, str]:
+async def latest_partials(
+    results: AsyncGenerator[tuple[str, bool, Optional[str]], None], interval: float
+) -> AsyncGenerator[tuple[str, bool, Optional[str]], None]:
+    """
+    Thin streaming results to at most one partial per `interval`, always the newest.
+    A partial held back mid-window goes out when the window closes; the final result always
+    passes through (and supersedes any partial still held).
+    """
+    loop = asyncio.get_running_loop()
+    last_sent = loop.time() - interval
+    held: Optional[str] = None
+    next_result = asyncio.ensure_future(results.__anext__())
+    try:
+        while True:
+            timeout = None if held is None else max(0.0, last_sent + interval - loop.time())
+            done, _ = await asyncio.wait({next_result}, timeout=timeout)
+            if not done:  # Window closed with a newer partial still unsent
+                yield held, False, None
+                held, last_sent = None, loop.time()
+                continue
+            try:
+                transcript, is_final, error = next_result.result()
+            except StopAsyncIteration:
+                return
+            if is_final:
+                held = None
+                yield transcript, True, error
+            elif loop.time() - last_sent >= interval:
+                held, last_sent = None, loop.time()
+                yield transcript, False, None
+            else:
+                held = transcript
+            next_result = asyncio.ensure_future(results.__anext__())
+    finally:
+        if not next_result.done():
+            next_result.cancel()
+            await asyncio.gather(next_result, return_exceptions=True)
+        await results.aclose()
+
+
+# Hiragana, katakana and halfwidth katakana - written only in Japanese
+KANA_PATTERN = re.compile(r"[\u3040-\u30ff\uff66-\uff9f]")
+
+
+def script_language(transcript: str) -> Optional[str]:
+    """Language code the script alone proves, or None when only a detector can tell"""
+    if KANA_PATTERN.search(transcript):
+        return "ja"
+    return None
+
+
+async def detect_language(text: str) -> tuple[tuple[str, float], Optional[str]]:
+    """Google Translate detection, cached by normalised text - learners repeat themselves a lot"""
+    return await detect_cache.get_or_fetch(normalize_utterance(text), lambda: _detect_language(text))
+
+
+async def _detect_language(text: str) -> tuple[tuple[str, float], Optional[str]]:
+    """Top (language_code, confidence) with error handling"""
+    try:
+        detection = await google_detect_language(text)
+    except Exception as e:
+        logger.error(f"Language detection error: {e}", exc_info=settings.log_tracebacks)
+        return ("", 0.0), f"Language detection failed: {e}"
+    
+    top = detection.languages[0] if detection.languages else None
+    return ((top.language_code.lower(), top.confidence) if top else ("", 0.0)), None
+
+
+async def detect_language_mismatch(transcript: str, target_language: str) -> tuple[bool, str, str]:
     """
     Detect if user spoke in wrong language using Google Translate's detection.
     Returns: (is_mismatch, message, detected_language)
@@ -367,68 +948,22 @@ def detect_language_mismatch(transcript: str, target_language: str) -> tuple[boo
         return False, "", "unknown"
     
     try:
-        # Use Google Translate to detect the language
-        detection = translate_client.detect_language(transcript)
-        
-        # Handle different response formats
-        if isinstance(detection, list):
-            detection = detection[0] if detection else {}
-        
-        detected_lang = detection.get("language", "").lower() if isinstance(detection, dict) else ""
-        confidence = detection.get("confidence", 0) if isinstance(detection, dict) else 0
-        
-        logger.info(f"🔍 Language detection result: {detection}")
-        logger.info(f"🔍 Detected: '{detected_lang}' (confidence: {confidence}) | Target: '{target_language}'")
+        # Kana settle it without a network round-trip; anything else goes to Google Translate
+        detected_lang = script_language(transcript)
+        if detected_lang:
+            logger.info(f"🔍 Script says: '{detected_lang}' | Target: '{target_language}'")
+        else:
+            (detected_lang, confidence), error = await detect_language(transcript)
+            if error:
+                return False, "", "error"  # If detection fails, don't block - let it through
+            
+            logger.info(f"🔍 Detected: '{detected_lang}' (confidence: {confidence}) | Target: '{target_language}'")
         
         # Get target language code
-        lang_config = SUPPORTED_LANGUAGES.get(target_language, SUPPORTED_LANGUAGES["italian"])
+        lang_config, _ = _resolve(target_language)
         target_code = lang_config["translate_code"].lower()
         
-        # Map of language codes to readable names
-        language_names = {
-            "en": "English",
-            "it": "Italian", 
-            "es": "Spanish",
-            "fr": "French",
-            "de": "German",
-            "ja": "Japanese",
-            "zh": "Chinese",
-            "zh-cn": "Chinese",
-            "zh-tw": "Chinese",
-            "ko": "Korean",
-            "pt": "Portuguese",
-            "ru": "Russian",
-            "ar": "Arabic",
-            "hi": "Hindi",
-            "nl": "Dutch",
-            "pl": "Polish",
-            "tr": "Turkish",
-            "vi": "Vietnamese",
-            "th": "Thai",
-            "sv": "Swedish",
-            "da": "Danish",
-            "no": "Norwegian",
-            "fi": "Finnish",
-            "el": "Greek",
-            "he": "Hebrew",
-            "id": "Indonesian",
-            "ms": "Malay",
-            "cs": "Czech",
-            "ro": "Romanian",
-            "hu": "Hungarian",
-            "uk": "Ukrainian",
-            "bg": "Bulgarian",
-            "hr": "Croatian",
-            "sk": "Slovak",
-            "sl": "Slovenian",
-            "lt": "Lithuanian",
-            "lv": "Latvian",
-            "et": "Estonian",
-            "und": "Unknown",
-            "": "Unknown"
-        }
-        
-        detected_name = language_names.get(detected_lang, detected_lang.upper() if detected_lang else "Unknown")
+        detected_name = _LANGUAGE_NAMES.get(detected_lang, detected_lang.upper() if detected_lang else "Unknown")
         target_name = lang_config["name"]
         
         # Handle empty or unknown detection
@@ -438,7 +973,7 @@ def detect_language_mismatch(transcript: str, target_language: str) -> tuple[boo
         
         # Get base language codes (handle variants like zh-CN, zh-TW, pt-BR)
         detected_base = detected_lang.split("-")[0]
-        target_base = target_code.split("-")[0]
+        target_base = _TARGET_BASES.get(target_language, _TARGET_BASES["italian"])
         
         logger.info(f"🔍 Comparing: detected_base='{detected_base}' vs target_base='{target_base}'")
         
@@ -452,24 +987,37 @@ def detect_language_mismatch(transcript: str, target_language: str) -> tuple[boo
         return False, "", detected_lang
         
     except Exception as e:
-        logger.error(f"Language detection error: {e}", exc_info=True)
+        logger.error(f"Language detection error: {e}", exc_info=settings.log_tracebacks)
         # If detection fails, don't block - let it through
         return False, "", "error"
 
 
-def analyze_with_gemini(transcript: str, language: str, dialect: str, history: list) -> tuple[dict, Optional[str]]:
+async def analyze_with_gemini(transcript: str, language: str, dialect: str, history: list) -> tuple[dict, Optional[str]]:
     """Gemini analysis - with language detection first"""
     
-    lang_config = SUPPORTED_LANGUAGES.get(language, SUPPORTED_LANGUAGES["italian"])
-    dialect_info = lang_config["dialects"].get(dialect, list(lang_config["dialects"].values())[0])
+    lang_config, dialect_info = _resolve(language, dialect)
     
-    # FIRST: Check for language mismatch using Google Translate detection
     logger.info(f"📝 Analyzing transcript: '{transcript}' | Target: {language}/{dialect}")
     
-    is_wrong_language, wrong_lang_message, detected_lang = detect_language_mismatch(transcript, language)
+    # Ask Gemini for feedback (or reuse feedback on the same utterance) while Google Translate
+    # checks the language, so a correct-language turn waits for max(detect, Gemini), not the sum.
+    # History is keyed by a fixed-size digest rather than up to 2 x MAX_HISTORY_CHARS per turn.
+    history_digest = hashlib.blake2b(orjson.dumps(history[-MAX_HISTORY_TURNS:]), digest_size=16).digest()
+    key = (language, dialect, normalize_utterance(transcript), history_digest)
+    gemini_task = asyncio.create_task(
+        gemini_cache.get_or_fetch(key, lambda: ask_gemini(transcript, language, dialect, history))
+    )
+    
+    try:
+        is_wrong_language, wrong_lang_message, detected_lang = await detect_language_mismatch(transcript, language)
+    except BaseException:
+        gemini_task.cancel()
+        raise
     
-    # If wrong language detected, return immediately without calling Gemini (saves quota!)
+    # If wrong language detected, drop the Gemini call and answer right away
     if is_wrong_language:
+        gemini_task.cancel()
+        await asyncio.gather(gemini_task, return_exceptions=True)
         logger.info(f"🛑 Returning wrong language response")
         return {
             "reaction": f"Whoa, stop right there! 🛑",
@@ -479,93 +1027,12 @@ def analyze_with_gemini(transcript: str, language: str, dialect: str, history: l
             "encouragement": f"Come on, give {lang_config['name']} a try! Even one word counts."
         }, None
     
-    # Language is correct, now call Gemini for feedback
+    # Language is correct, use Gemini's feedback
     try:
-        # Try models in order - lite models have higher free tier limits!
-        models_to_try = [
-            "gemini-2.0-flash-lite",      # Lite = higher free tier quota
-            "gemini-2.0-flash-lite-001",
-            "gemini-flash-lite-latest",
-            "gemini-2.0-flash",           # Regular flash
-            "gemini-2.0-flash-001",
-            "gemini-flash-latest",
-            "gemini-2.0-flash-exp",       # Experimental (strict limits)
-        ]
-        
-        system_prompt = get_tutor_prompt(language, dialect)
-        
-        # Build conversation context
-        history_text = ""
-        if history:
-            history_text = "\n\nRecent conversation:\n"
-            for h in history[-2:]:
-                history_text += f"Learner: {h.get('user', '')}\nTutor: {h.get('tutor', '')}\n"
-        
-        prompt = f"""{system_prompt}
-{history_text}
-TARGET LANGUAGE: {lang_config['name']}
-LEARNER SAID: "{transcript}"
-
-Give honest feedback on their {lang_config['name']}. Be direct and helpful.
-
-Reply ONLY with valid JSON:
-{{"reaction": "genuine reaction", "correction": "specific feedback or 'Good!'", "response": "reply in {lang_config['name']}", "cultural_note": "", "encouragement": "honest assessment"}}"""
-        
-        response = None
-        successful_model = None
-        
-        for model_name in models_to_try:
-            try:
-                logger.info(f"🤖 Trying model: {model_name}...")
-                model = genai.GenerativeModel(model_name)
-                
-                response = model.generate_content(
-                    prompt,
-                    generation_config=genai.types.GenerationConfig(
-                        temperature=0.8,
-                        max_output_tokens=300
-                    )
-                )
-                successful_model = model_name
-                logger.info(f"✅ Model {model_name} succeeded!")
-                break
-                
-            except Exception as e:
-                error_str = str(e)
-                if "429" in error_str or "quota" in error_str.lower() or "resource" in error_str.lower():
-                    logger.warning(f"⚠️ {model_name}: quota exceeded, trying next...")
-                elif "404" in error_str:
-                    logger.warning(f"⚠️ {model_name}: not found, trying next...")
-                else:
-                    logger.warning(f"⚠️ {model_name}: {error_str[:80]}...")
-                continue
-        
-        if response is None:
-            raise Exception("All models exhausted or unavailable")
-        
-        text = response.text.strip()
-        logger.info(f"🤖 Response from {successful_model}: {text[:150]}...")
-        
-        # Parse JSON
-        if "```json" in text:
-            text = text.split("```json")[1].split("```")[0]
-        elif "```" in text:
-            text = text.split("```")[1].split("```")[0]
-        
-        result = json.loads(text.strip())
-        logger.info(f"✅ Gemini parsed successfully")
-        
-        return {
-            "reaction": result.get("reaction", ""),
-            "correction": result.get("correction", ""),
-            "response": result.get("response", ""),
-            "cultural_note": result.get("cultural_note", ""),
-            "encouragement": result.get("encouragement", "")
-        }, None
+        return await gemini_task
         
     except json.JSONDecodeError as e:
         logger.warning(f"Gemini JSON parse error: {e}")
-        logger.warning(f"Raw text was: {text[:500] if 'text' in dir() else 'N/A'}")
         return {
             "reaction": "I heard you!",
             "correction": "Let me help you with that.",
@@ -591,37 +1058,117 @@ Reply ONLY with valid JSON:
         return None, f"AI analysis failed: {error_msg}"
 
 
-def translate_text(text: str, source_lang: str, target_lang: str = "en") -> tuple[str, Optional[str]]:
+def tutor_model(model_name: str, language: str, dialect: str) -> genai.GenerativeModel:
+    """Preloaded model handle for a persona - unknown values fall back like get_tutor_prompt"""
+    if language not in SUPPORTED_LANGUAGES:
+        language = "italian"
+    if dialect not in SUPPORTED_LANGUAGES[language]["dialects"]:
+        dialect = _FIRST_DIALECT[language]
+    return app.state.gemini_models[(model_name, language, dialect)]
+
+
+async def ask_gemini(transcript: str, language: str, dialect: str, history: list) -> tuple[dict, None]:
+    """Gemini feedback call - raises once every model has failed or the reply isn't JSON"""
+    lang_config, _ = _resolve(language)
+    
+    # Build conversation context
+    history_text = ""
+    if history:
+        history_text = "\n\nRecent conversation:\n"
+        for h in history[-MAX_HISTORY_TURNS:]:
+            history_text += f"Learner: {h.get('user', '')}\nTutor: {h.get('tutor', '')}\n"
+    
+    # The persona prompt is the model's system instruction - only the turn itself goes here
+    prompt = f"""{history_text}
+TARGET LANGUAGE: {lang_config['name']}
+LEARNER SAID: "{transcript}"
+
+Give honest feedback on their {lang_config['name']}. Be direct and helpful. Reply in the JSON response format."""
+    
+    global last_good_model
+    response = None
+    successful_model = None
+    
+    models_to_try = GEMINI_MODELS
+    if last_good_model:
+        models_to_try = [last_good_model, *(name for name in GEMINI_MODELS if name != last_good_model)]
+    
+    for model_name in models_to_try:
+        try:
+            logger.info(f"🤖 Trying model: {model_name}...")
+            model = tutor_model(model_name, language, dialect)
+            
+            async with gemini_semaphore:
+                response = await model.generate_content_async(prompt)
+            successful_model = last_good_model = model_name
+            logger.info(f"✅ Model {model_name} succeeded!")
+            break
+            
+        except Exception as e:
+            if model_name == last_good_model:
+                last_good_model = None  # start from the top of the list again next turn
+            error_str = str(e)
+            if "429" in error_str or "quota" in error_str.lower() or "resource" in error_str.lower():
+                logger.warning(f"⚠️ {model_name}: quota exceeded, trying next...")
+            elif "404" in error_str:
+                logger.warning(f"⚠️ {model_name}: not found, trying next...")
+            else:
+                logger.warning(f"⚠️ {model_name}: {error_str[:80]}...")
+            continue
+    
+    if response is None:
+        raise Exception("All models exhausted or unavailable")
+    
+    text = response.text.strip()
+    logger.info(f"🤖 Response from {successful_model}: {text[:150]}...")
+    
+    # Parse JSON (orjson's decode error subclasses json.JSONDecodeError)
+    fence = JSON_FENCE_PATTERN.search(text)
+    if fence:
+        text = fence.group(1)
+    
+    try:
+        result = orjson.loads(text)
+    except json.JSONDecodeError:
+        logger.warning(f"Raw text was: {text[:500]}")
+        raise
+    logger.info(f"✅ Gemini parsed successfully")
+    
+    return {
+        "reaction": result.get("reaction", ""),
+        "correction": result.get("correction", ""),
+        "response": result.get("response", ""),
+        "cultural_note": result.get("cultural_note", ""),
+        "encouragement": result.get("encouragement", "")
+    }, None
+
+
+async def translate_text(text: str, source_lang: str, target_lang: str = "en") -> tuple[str, Optional[str]]:
+    """Google Translate, cached by (text, source, target)"""
+    key = (text, source_lang, target_lang)
+    return await translate_cache.get_or_fetch(key, lambda: _translate_text(text, source_lang, target_lang))
+
+
+async def _translate_text(text: str, source_lang: str, target_lang: str = "en") -> tuple[str, Optional[str]]:
     """Google Translate with error handling"""
     try:
-        lang_config = SUPPORTED_LANGUAGES.get(source_lang, SUPPORTED_LANGUAGES["italian"])
-        result = translate_client.translate(
-            text, 
-            source_language=lang_config["translate_code"],
-            target_language=target_lang
-        )
+        lang_config, _ = _resolve(source_lang)
+        result = await google_translate(text, lang_config["translate_code"], target_lang)
         # Decode HTML entities (e.g., &#39; -> ')
-        import html
-        translated = html.unescape(result["translatedText"])
+        translated = html.unescape(result.translations[0].translated_text)
         return translated, None
     except Exception as e:
         logger.error(f"Translate API error: {e}")
         return "", f"Translation failed: {str(e)}"
 
 
-async def synthesize_speech(text: str, language: str, dialect: str) -> tuple[str, Optional[str]]:
-    """ElevenLabs TTS with error handling"""
+async def synthesize_speech(text: str, language: str, dialect: str) -> tuple[bytes, Optional[str]]:
+    """ElevenLabs TTS with error handling - returns raw MP3 bytes"""
     try:
-        lang_config = SUPPORTED_LANGUAGES.get(language, SUPPORTED_LANGUAGES["italian"])
-        dialect_config = lang_config["dialects"].get(dialect, list(lang_config["dialects"].values())[0])
+        _, dialect_config = _resolve(language, dialect)
         
         url = f"https://api.elevenlabs.io/v1/text-to-speech/{dialect_config['voice_id']}"
         
-        headers = {
-            "xi-api-key": ELEVENLABS_API_KEY,
-            "Content-Type": "application/json"
-        }
-        
         payload = {
             "text": text,
             "model_id": "eleven_multilingual_v2",
@@ -633,40 +1180,130 @@ async def synthesize_speech(text: str, language: str, dialect: str) -> tuple[str
             }
         }
         
-        response = await http_client.post(url, json=payload, headers=headers)
+        # httpx sets Content-Type: application/json for json= bodies
+        async with tts_semaphore:
+            response = await get_http_client().post(url, json=payload, headers=ELEVENLABS_HEADERS)
         
         if response.status_code == 401:
-            return "", "ElevenLabs API key invalid"
+            return b"", "ElevenLabs API key invalid"
         elif response.status_code == 429:
-            return "", "Voice generation quota exceeded. Please try again later."
+            return b"", "Voice generation quota exceeded. Please try again later."
         
         response.raise_for_status()
-        audio_base64 = base64.b64encode(response.content).decode("utf-8")
         
         logger.info(f"🔊 Generated {len(response.content)} bytes of audio")
-        return audio_base64, None
+        return response.content, None
         
     except httpx.TimeoutException:
         logger.error("ElevenLabs timeout")
-        return "", "Voice generation timed out. Please try again."
+        return b"", "Voice generation timed out. Please try again."
     except Exception as e:
         logger.error(f"ElevenLabs error: {e}")
-        return "", f"Voice generation failed: {str(e)}"
+        return b"", f"Voice generation failed: {str(e)}"
+
+
+class HistoryTurn(BaseModel):
+    """One learner/tutor exchange sent back by the client (extra keys are ignored)"""
+    user: str = ""
+    tutor: str = ""
+    
+    @field_validator("user", "tutor")
+    @classmethod
+    def clip(cls, value: str) -> str:
+        return value[:MAX_HISTORY_CHARS]
+
+
+HISTORY_ADAPTER = TypeAdapter(list[HistoryTurn])
+
+
+def parse_history(history: str) -> list:
+    """Decode and validate the history JSON in one pass, keeping only the turns the prompt uses"""
+    try:
+        turns = HISTORY_ADAPTER.validate_json(history)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid history: {e.errors()[0]['msg']}")
+    return [turn.model_dump() for turn in turns[-MAX_HISTORY_TURNS:]]
+
+
+def sse_event(event: str, data: dict) -> bytes:
+    """One framed SSE message - orjson escapes newlines, so the payload is always a single data line"""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+SSE_KEEPALIVE = b": keepalive\n\n"  # comment frame - clients ignore it, proxies see traffic
+
+
+async def with_keepalive(events: AsyncGenerator[bytes, None], interval: float) -> AsyncGenerator[bytes, None]:
+    """Pass frames through, emitting a keepalive comment whenever the stream is quiet for `interval`"""
+    next_frame = asyncio.ensure_future(events.__anext__())
+    try:
+        while True:
+            done, _ = await asyncio.wait({next_frame}, timeout=interval)
+            if not done:
+                yield SSE_KEEPALIVE
+                continue
+            try:
+                frame = next_frame.result()
+            except StopAsyncIteration:
+                return
+            yield frame
+            next_frame = asyncio.ensure_future(events.__anext__())
+    finally:
+        if not next_frame.done():
+            next_frame.cancel()
+            await asyncio.gather(next_frame, return_exceptions=True)
+        await events.aclose()
+
+
+def _progress_frames(lang_config: dict, dialect_config: dict) -> dict[str, bytes]:
+    """Framed progress events for one persona, keyed by step"""
+    steps = [
+        ("receiving", f"🎤 {dialect_config['name']} is listening...", 10),
+        ("transcribing", f"📝 Understanding your {lang_config['name']}...", 25),
+        ("analyzing", f"🤔 {dialect_config['name']} is thinking...", 45),
+        ("translating", "🌐 Creating subtitles...", 65),
+        ("synthesizing", f"🗣️ {dialect_config['name']} is preparing to speak...", 85),
+        ("complete", "✅ Ready!", 100),
+    ]
+    return {
+        step: sse_event("progress", {"step": step, "message": message, "progress": progress})
+        for step, message, progress in steps
+    }
+
+
+# Progress frames never change for a persona, so they're serialized once at import
+PROGRESS_FRAMES = {key: _progress_frames(*configs) for key, configs in _LANG_DIALECT_CACHE.items()}
 
 
 # === Rate Limit Middleware ===
+def client_ip(request: Request) -> str:
+    """Caller address for rate limiting, interned since the same few IPs key every limiter"""
+    ip = request.client.host if request.client else "unknown"
+    hops = settings.trusted_proxy_hops
+    if hops:
+        # Each trusted proxy appends the address it saw, so the client is `hops` from the right;
+        # anything further left is caller-supplied and can't be trusted
+        forwarded = [part.strip() for part in request.headers.get("x-forwarded-for", "").split(",") if part.strip()]
+        if forwarded:
+            ip = forwarded[-hops] if len(forwarded) >= hops else forwarded[0]
+    return sys.intern(ip)
+
+
 @app.middleware("http")
 async def rate_limit_middleware(request: Request, call_next):
-    # Skip rate limiting for health checks
-    if request.url.path in ["/health", "/dialects", "/languages"]:
+    # Skip rate limiting for health checks, CORS preflights and reply audio (one fetch per
+    # /converse turn, already limited there, served from memory by an unguessable token)
+    path = request.url.path
+    if request.method == "OPTIONS" or path in ["/health", "/dialects", "/languages"] or path.startswith("/audio/"):
         return await call_next(request)
     
-    client_ip = request.client.host if request.client else "unknown"
-    allowed, retry_after = rate_limiter.is_allowed(client_ip)
+    ip = client_ip(request)
+    limiter = route_rate_limiters.get(path, rate_limiter)
+    allowed, retry_after = limiter.is_allowed(ip)
     
     if not allowed:
-        logger.warning(f"⚠️ Rate limit exceeded for {client_ip}")
-        return JSONResponse(
+        logger.warning(f"⚠️ Rate limit exceeded for {ip} on {path}")
+        return ORJSONResponse(
             status_code=429,
             content={
                 "error": "Rate limit exceeded",
@@ -682,8 +1319,8 @@ async def rate_limit_middleware(request: Request, call_next):
 # === Global Exception Handler ===
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    logger.error(f"🔥 Unhandled exception: {exc}", exc_info=True)
-    return JSONResponse(
+    logger.error(f"🔥 Unhandled exception: {exc}", exc_info=settings.log_tracebacks)
+    return ORJSONResponse(
         status_code=500,
         content={
             "error": "Internal server error",
@@ -704,120 +1341,104 @@ async def converse(
     """Main conversation endpoint with SSE progress updates"""
     
     # Validate dialect for language
-    lang_config = SUPPORTED_LANGUAGES.get(language, SUPPORTED_LANGUAGES["italian"])
-    available_dialects = list(lang_config["dialects"].keys())
+    if language not in SUPPORTED_LANGUAGES:
+        language = "italian"
+    lang_config = SUPPORTED_LANGUAGES[language]
     
-    if not dialect or dialect not in available_dialects:
-        dialect = available_dialects[0]
+    if dialect not in lang_config["dialects"]:
+        dialect = _FIRST_DIALECT[language]
     
     dialect_config = lang_config["dialects"][dialect]
     
-    # READ AUDIO BEFORE ENTERING THE GENERATOR (fixes closed file issue)
-    audio_content = await audio.read()
+    # Reject malformed history before touching the upload
+    conversation_history = parse_history(history)
     
-    # Parse conversation history
-    try:
-        conversation_history = json.loads(history)
-    except:
-        conversation_history = []
+    # COPY AUDIO BEFORE ENTERING THE GENERATOR (FastAPI closes the upload first).
+    # Spooled, so long clips sit on disk rather than in RAM, and hashed on the way through.
+    audio_file, audio_size, audio_digest = await spool_upload(audio)
     
-    async def generate_events() -> AsyncGenerator[dict, None]:
+    progress = PROGRESS_FRAMES[(language, dialect)]
+    
+    async def generate_events() -> AsyncGenerator[bytes, None]:
+        tts_task: Optional[asyncio.Task] = None
+        # Frames with no await between them are joined into one yield, so they go out in one write
         try:
             # Step 1: Receive audio
-            yield {"event": "progress", "data": json.dumps({
-                "step": "receiving",
-                "message": f"🎤 {dialect_config['name']} is listening...",
-                "progress": 10
-            })}
-            
-            if len(audio_content) < 1000:  # Too small, probably empty
-                yield {"event": "error", "data": json.dumps({
+            if audio_size < 1000:  # Too small, probably empty
+                yield progress["receiving"] + sse_event("error", {
                     "message": "Audio too short. Please speak for at least 1 second."
-                })}
+                })
                 return
             
             # Step 2: Transcribe
-            yield {"event": "progress", "data": json.dumps({
-                "step": "transcribing",
-                "message": f"📝 Understanding your {lang_config['name']}...",
-                "progress": 25
-            })}
+            yield progress["receiving"] + progress["transcribing"]
             
-            transcript, error = await transcribe_audio(audio_content, language)
+            if audio_size > STT_STREAMING_THRESHOLD:
+                # Long clip: stream it so the learner sees words while Speech is still working.
+                # Partials are cumulative, so within a window only the newest is worth sending.
+                results = stream_transcribe_audio(audio_file, audio_digest, language)
+                async for transcript, is_final, error in latest_partials(results, SSE_PARTIAL_INTERVAL):
+                    if not is_final:
+                        yield sse_event("partial", {"transcript": transcript})
+            else:
+                transcript, error = await transcribe_audio(audio_file, audio_digest, language)
             
             if error:
-                yield {"event": "error", "data": json.dumps({"message": error})}
+                yield sse_event("error", {"message": error})
                 return
             
             if not transcript:
-                yield {"event": "error", "data": json.dumps({
+                yield sse_event("error", {
                     "message": "Couldn't hear you clearly. Please try again!"
-                })}
+                })
                 return
             
-            yield {"event": "transcript", "data": json.dumps({
-                "transcript": transcript
-            })}
-            
             # Step 3: Analyze with Gemini
-            yield {"event": "progress", "data": json.dumps({
-                "step": "analyzing",
-                "message": f"🤔 {dialect_config['name']} is thinking...",
-                "progress": 45
-            })}
+            yield sse_event("transcript", {
+                "transcript": transcript
+            }) + progress["analyzing"]
             
-            gemini_result, error = analyze_with_gemini(transcript, language, dialect, conversation_history)
+            gemini_result, error = await analyze_with_gemini(transcript, language, dialect, conversation_history)
             
             if error:
-                yield {"event": "error", "data": json.dumps({"message": error})}
+                yield sse_event("error", {"message": error})
                 return
             
-            yield {"event": "analysis", "data": json.dumps({
+            # Step 4: Translate - voice synthesis only needs the same reply, so it starts now too
+            yield sse_event("analysis", {
                 "reaction": gemini_result.get("reaction", ""),
                 "correction": gemini_result.get("correction", ""),
                 "encouragement": gemini_result.get("encouragement", ""),
                 "cultural_note": gemini_result.get("cultural_note", "")
-            })}
-            
-            # Step 4: Translate
-            yield {"event": "progress", "data": json.dumps({
-                "step": "translating",
-                "message": "🌐 Creating subtitles...",
-                "progress": 65
-            })}
+            }) + progress["translating"]
             
             native_response = gemini_result.get("response", "")
-            translation, error = translate_text(native_response, language)
+            tts_task = asyncio.create_task(synthesize_speech(native_response, language, dialect))
+            translation, error = await translate_text(native_response, language)
             
             if error:
                 translation = "(Translation unavailable)"
             
-            yield {"event": "translation", "data": json.dumps({
+            # Step 5: Generate voice
+            yield sse_event("translation", {
                 "native": native_response,
                 "english": translation
-            })}
-            
-            # Step 5: Generate voice
-            yield {"event": "progress", "data": json.dumps({
-                "step": "synthesizing",
-                "message": f"🗣️ {dialect_config['name']} is preparing to speak...",
-                "progress": 85
-            })}
+            }) + progress["synthesizing"]
             
-            audio_base64, error = await synthesize_speech(native_response, language, dialect)
+            audio, error = await tts_task
             
             if error:
-                logger.warning(f"Voice synthesis failed: {error}")
-                audio_base64 = ""  # Continue without audio
+                logger.warning("Voice synthesis failed: %s", error)
             
-            # Step 6: Complete
-            yield {"event": "progress", "data": json.dumps({
-                "step": "complete",
-                "message": "✅ Ready!",
-                "progress": 100
-            })}
+            # The browser fetches the MP3 itself, so it is never base64'd into the SSE frame
+            audio_url = ""
+            if audio:  # Empty on failure - continue without audio
+                token = secrets.token_urlsafe(16)
+                audio_store[token] = audio
+                audio_url = f"/audio/{token}"
             
-            yield {"event": "complete", "data": json.dumps({
+            # Step 6: Complete
+            yield progress["complete"] + sse_event("complete", {
                 "transcript": transcript,
                 "reaction": gemini_result.get("reaction", ""),
                 "correction": gemini_result.get("correction", ""),
@@ -825,22 +1446,30 @@ async def converse(
                 "cultural_note": gemini_result.get("cultural_note", ""),
                 "response_native": native_response,
                 "response_english": translation,
-                "audio_base64": audio_base64,
+                "audio_url": audio_url,
                 "tutor_name": dialect_config["name"],
                 "tutor_region": dialect_config["region"],
                 "language": language,
                 "dialect": dialect
-            })}
+            })
             
-            logger.info(f"✅ Conversation complete: {language}/{dialect}")
+            logger.info("✅ Conversation complete: %s/%s", language, dialect)
             
         except Exception as e:
-            logger.error(f"Conversation error: {e}", exc_info=True)
-            yield {"event": "error", "data": json.dumps({
+            logger.error("Conversation error: %s", e, exc_info=settings.log_tracebacks)
+            yield sse_event("error", {
                 "message": "Something went wrong. Please try again!"
-            })}
+            })
+        finally:
+            if tts_task is not None:
+                tts_task.cancel()  # no-op once finished; stops ElevenLabs work if the client left
+            audio_file.close()
     
-    return EventSourceResponse(generate_events())
+    return StreamingResponse(
+        with_keepalive(generate_events(), SSE_PING_INTERVAL),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache, no-transform", "X-Accel-Buffering": "no"},
+    )
 
 
 # === Get Tutor Greeting ===
@@ -851,73 +1480,95 @@ async def get_greeting(
     include_audio: bool = Query(default=False)  # Audio is optional now
 ):
     """Get tutor's greeting to start conversation"""
-    lang_config = SUPPORTED_LANGUAGES.get(language, SUPPORTED_LANGUAGES["italian"])
-    available_dialects = list(lang_config["dialects"].keys())
+    if language not in SUPPORTED_LANGUAGES:
+        language = "italian"
+    lang_config = SUPPORTED_LANGUAGES[language]
     
-    if not dialect or dialect not in available_dialects:
-        dialect = available_dialects[0]
+    if dialect not in lang_config["dialects"]:
+        dialect = _FIRST_DIALECT[language]
     
-    dialect_config = lang_config["dialects"][dialect]
+    # The greeting is fixed per persona, so the whole body is cached (failed parts are retried)
+    body, _ = await greeting_cache.get_or_fetch(
+        (language, dialect, include_audio), lambda: build_greeting(language, dialect, include_audio)
+    )
+    return body
+
+
+async def build_greeting(language: str, dialect: str, include_audio: bool) -> tuple[dict, Optional[str]]:
+    """Greeting body - the error is set when translation or audio failed, so it isn't cached"""
+    dialect_config = SUPPORTED_LANGUAGES[language]["dialects"][dialect]
     
-    # Only generate audio if explicitly requested
-    audio_base64 = ""
+    # Translate greeting (this is cheap/free); only generate audio if explicitly requested,
+    # in parallel with the translation
+    audio, audio_error = b"", None
     if include_audio:
-        audio_base64, _ = await synthesize_speech(dialect_config["greeting"], language, dialect)
-    
-    # Translate greeting (this is cheap/free)
-    translation, _ = translate_text(dialect_config["greeting"], language)
+        (audio, audio_error), (translation, error) = await asyncio.gather(
+            synthesize_speech(dialect_config["greeting"], language, dialect),
+            translate_text(dialect_config["greeting"], language),
+        )
+    else:
+        translation, error = await translate_text(dialect_config["greeting"], language)
     
     return {
         "tutor_name": dialect_config["name"],
         "region": dialect_config["region"],
         "greeting_native": dialect_config["greeting"],
         "greeting_english": translation,
-        "audio_base64": audio_base64,
+        "audio_base64": pybase64.b64encode(audio).decode("ascii"),  # SIMD-accelerated encoder
         "personality": dialect_config["personality"]
-    }
+    }, error or audio_error
+
+
+# === Get Synthesized Reply Audio ===
+@app.get("/audio/{token}")
+async def get_audio(token: str):
+    """MP3 for a /converse reply, referenced by the audio_url of its complete event"""
+    audio = audio_store.get(token)
+    if audio is None:
+        raise HTTPException(status_code=404, detail="Audio not found or expired")
+    return Response(
+        content=audio,
+        media_type="audio/mpeg",
+        headers={"Cache-Control": f"private, max-age={settings.audio_store_ttl}"}  # tokens are never reused
+    )
 
 
 # === Health Check ===
-@app.get("/health")
-async def health():
-    return {
+@lru_cache(maxsize=1)
+def health_body(second: int) -> bytes:
+    """Serialized health payload - rebuilt at most once per second however often probes hit"""
+    return orjson.dumps({
         "status": "healthy",
         "service": "language-mirror",
         "version": "2.0.0",
-        "timestamp": datetime.utcnow().isoformat()
-    }
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(second))
+    })
+
+
+@app.get("/health")
+async def health():
+    return Response(content=health_body(int(time.time())), media_type="application/json")
 
 
 # === Get All Languages ===
-@app.get("/languages")
-async def get_languages():
-    """Get all supported languages and their dialects"""
-    return {
-        lang_key: {
-            "name": lang["name"],
-            "flag": lang["flag"],
-            "dialects": {
-                d_key: {
-                    "name": d["name"],
-                    "region": d["region"]
-                }
-                for d_key, d in lang["dialects"].items()
+# Language metadata is fixed for the life of the process, so both bodies are serialized once
+LANGUAGES_JSON = orjson.dumps({
+    lang_key: {
+        "name": lang["name"],
+        "flag": lang["flag"],
+        "dialects": {
+            d_key: {
+                "name": d["name"],
+                "region": d["region"]
             }
+            for d_key, d in lang["dialects"].items()
         }
-        for lang_key, lang in SUPPORTED_LANGUAGES.items()
     }
+    for lang_key, lang in SUPPORTED_LANGUAGES.items()
+})
 
-
-# === Get Dialects for Language ===
-@app.get("/dialects/{language}")
-async def get_dialects(language: str):
-    """Get dialects for a specific language"""
-    lang_config = SUPPORTED_LANGUAGES.get(language)
-    
-    if not lang_config:
-        raise HTTPException(status_code=404, detail=f"Language '{language}' not supported")
-    
-    return {
+DIALECTS_JSON = {
+    lang_key: orjson.dumps({
         "language": lang_config["name"],
         "flag": lang_config["flag"],
         "dialects": {
@@ -928,9 +1579,39 @@ async def get_dialects(language: str):
             }
             for d_key, d in lang_config["dialects"].items()
         }
-    }
+    })
+    for lang_key, lang_config in SUPPORTED_LANGUAGES.items()
+}
+
+
+@app.get("/languages")
+async def get_languages():
+    """Get all supported languages and their dialects"""
+    return Response(content=LANGUAGES_JSON, media_type="application/json")
+
+
+# === Get Dialects for Language ===
+@app.get("/dialects/{language}")
+async def get_dialects(language: str):
+    """Get dialects for a specific language"""
+    body = DIALECTS_JSON.get(language)
+    
+    if body is None:
+        raise HTTPException(status_code=404, detail=f"Language '{language}' not supported")
+    
+    return Response(content=body, media_type="application/json")
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8080)
\ No newline at end of file
+    # uvloop event loop + httptools parser (both ship with uvicorn[standard]).
+    # Multiple workers need an import string; a single one reuses this module as loaded.
+    uvicorn.run(
+        "main:app" if settings.web_concurrency > 1 else app,
+        host="0.0.0.0",
+        port=8080,
+        loop="uvloop",
+        http="httptools",
+        workers=settings.web_concurrency,
+        log_level=settings.uvicorn_log_level
+    )
\ No newline at end of file
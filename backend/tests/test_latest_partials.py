@@ -0,0 +1,36 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from main import latest_partials  # noqa: E402
+
+
+async def fake_stream(steps):
+    """Yields (transcript, is_final, None) after each step's delay, like stream_transcribe_audio"""
+    for delay, transcript, is_final in steps:
+        await asyncio.sleep(delay)
+        yield transcript, is_final, None
+
+
+async def collect(steps, interval=0.05):
+    return [result[:2] async for result in latest_partials(fake_stream(steps), interval)]
+
+
+def test_newest_partial_in_a_window_is_sent_when_it_closes():
+    results = asyncio.run(collect([
+        (0.0, "Ciao", False),
+        (0.01, "Ciao come", False),  # inside the first window - held, not dropped
+        (0.2, "Ciao come stai", True),
+    ]))
+    assert results == [("Ciao", False), ("Ciao come", False), ("Ciao come stai", True)]
+
+
+def test_final_supersedes_a_held_partial():
+    results = asyncio.run(collect([
+        (0.0, "a", False),
+        (0.01, "a b", False),
+        (0.01, "a b c", True),
+    ]))
+    assert results == [("a", False), ("a b c", True)]
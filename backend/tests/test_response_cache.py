@@ -0,0 +1,82 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from main import ResponseCache  # noqa: E402
+
+
+class FakeUpstream:
+    """Counts calls; each one takes a moment so concurrent callers overlap"""
+    def __init__(self, error=None):
+        self.calls = 0
+        self.error = error
+
+    async def fetch(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return f"value-{self.calls}", self.error
+
+
+def test_concurrent_failures_share_one_upstream_call():
+    async def scenario():
+        cache = ResponseCache(maxsize=10, ttl=60)
+        upstream = FakeUpstream(error="Service unavailable")
+
+        results = await asyncio.gather(*(cache.get_or_fetch("k", upstream.fetch) for _ in range(5)))
+        assert upstream.calls == 1
+        assert results == [("value-1", "Service unavailable")] * 5
+
+        # Failures aren't cached, so a later request tries again
+        assert await cache.get_or_fetch("k", upstream.fetch) == ("value-2", "Service unavailable")
+        assert upstream.calls == 2
+        assert not cache.in_flight and not cache.waiters
+
+    asyncio.run(scenario())
+
+
+def test_success_is_cached():
+    async def scenario():
+        cache = ResponseCache(maxsize=10, ttl=60)
+        upstream = FakeUpstream()
+
+        results = await asyncio.gather(*(cache.get_or_fetch("k", upstream.fetch) for _ in range(5)))
+        assert results == [("value-1", None)] * 5
+        assert await cache.get_or_fetch("k", upstream.fetch) == ("value-1", None)
+        assert upstream.calls == 1
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_caller_leaves_fetch_running_for_others():
+    async def scenario():
+        cache = ResponseCache(maxsize=10, ttl=60)
+        upstream = FakeUpstream()
+
+        leaving = asyncio.create_task(cache.get_or_fetch("k", upstream.fetch))
+        staying = asyncio.create_task(cache.get_or_fetch("k", upstream.fetch))
+        await asyncio.sleep(0)
+        leaving.cancel()
+
+        assert await staying == ("value-1", None)
+        assert upstream.calls == 1
+
+    asyncio.run(scenario())
+
+
+def test_fetch_is_cancelled_once_every_caller_leaves():
+    async def scenario():
+        cache = ResponseCache(maxsize=10, ttl=60)
+        upstream = FakeUpstream()
+
+        caller = asyncio.create_task(cache.get_or_fetch("k", upstream.fetch))
+        await asyncio.sleep(0)
+        caller.cancel()
+        await asyncio.gather(caller, return_exceptions=True)
+        await asyncio.sleep(0)
+
+        assert not cache.in_flight
+        assert await cache.get_or_fetch("k", upstream.fetch) == ("value-2", None)
+
+    asyncio.run(scenario())
@@ -1,6 +1,6 @@
 "use client";
 
-import { useRef, useState, useCallback } from "react";
+import { useRef, useState, useCallback, useEffect } from "react";
 import { Box, Container, Typography, useTheme, useMediaQuery } from "@mui/material";
 import { useQuery } from "@tanstack/react-query";
 import { useGSAP } from "@gsap/react";
@@ -16,7 +16,8 @@ import ErrorToast from "@/components/ErrorToast";
 import {
   fetchLanguages,
   startConversation,
-  playAudioBase64,
+  fetchAudio,
+  playAudioUrl,
   ProgressEvent,
   AnalysisEvent,
   CompleteEvent,
@@ -45,6 +46,15 @@ export default function Home() {
   const mainRef = useRef<HTMLDivElement>(null);
   const titleRef = useRef<HTMLHeadingElement>(null);
 
+  // Object URLs of downloaded tutor audio, revoked when the conversation is cleared
+  const audioUrlsRef = useRef<string[]>([]);
+  const revokeAudioUrls = useCallback(() => {
+    audioUrlsRef.current.forEach((url) => URL.revokeObjectURL(url));
+    audioUrlsRef.current = [];
+  }, []);
+
+  useEffect(() => revokeAudioUrls, [revokeAudioUrls]);
+
   // Fetch languages
   const { data: languages } = useQuery({
     queryKey: ["languages"],
@@ -69,11 +79,12 @@ export default function Home() {
 
   // Handle language/dialect change
   const handleLanguageChange = useCallback((lang: string, dial: string) => {
+    revokeAudioUrls();
     setMessages([]);
     setLanguage(lang);
     setDialect(dial);
     setError(null);
-  }, []);
+  }, [revokeAudioUrls]);
 
   // Get conversation history for API
   const getConversationHistory = useCallback((): ConversationMessage[] => {
@@ -106,6 +117,9 @@ export default function Home() {
         onProgress: (data) => {
           setProgress(data);
         },
+        onPartial: (transcript) => {
+          setProgress((prev) => (prev ? { ...prev, message: `📝 "${transcript}"` } : prev));
+        },
         onTranscript: (transcript) => {
           const userMsg: Message = {
             id: `user-${Date.now()}`,
@@ -135,8 +149,10 @@ export default function Home() {
           setIsProcessing(false);
           setProgress(null);
 
+          // Show the reply right away; the audio is patched in once it has downloaded
+          const tutorMsgId = `tutor-${Date.now()}`;
           const tutorMsg: Message = {
-            id: `tutor-${Date.now()}`,
+            id: tutorMsgId,
             type: "tutor",
             content: {
               native: data.response_native,
@@ -144,7 +160,6 @@ export default function Home() {
               reaction: data.reaction,
               encouragement: data.encouragement,
               culturalNote: data.cultural_note,
-              audioBase64: data.audio_base64,
             },
             tutorName: data.tutor_name,
             tutorRegion: data.tutor_region,
@@ -152,15 +167,29 @@ export default function Home() {
           };
           setMessages((prev) => [...prev, tutorMsg]);
 
-          if (data.audio_base64) {
-            setIsPlaying(true);
-            try {
-              await playAudioBase64(data.audio_base64);
-            } catch (err) {
-              console.error("Audio playback failed:", err);
-            }
-            setIsPlaying(false);
+          if (!data.audio_url) return;
+
+          let audioUrl: string;
+          try {
+            audioUrl = await fetchAudio(data.audio_url);
+          } catch (err) {
+            console.error("Audio download failed:", err);
+            return;
+          }
+          audioUrlsRef.current.push(audioUrl);
+          setMessages((prev) =>
+            prev.map((msg) =>
+              msg.id === tutorMsgId ? { ...msg, content: { ...msg.content, audioUrl } } : msg,
+            ),
+          );
+
+          setIsPlaying(true);
+          try {
+            await playAudioUrl(audioUrl);
+          } catch (err) {
+            console.error("Audio playback failed:", err);
           }
+          setIsPlaying(false);
         },
         onError: (errorMsg) => {
           setIsProcessing(false);
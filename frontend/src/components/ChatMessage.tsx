@@ -5,7 +5,7 @@ import { Box, Typography, Paper, Avatar, Chip, useTheme, IconButton } from "@mui
 import { VolumeUp, Person, AutoAwesome } from "@mui/icons-material";
 import { useGSAP } from "@gsap/react";
 import gsap from "gsap";
-import { playAudioBase64 } from "@/lib/api";
+import { playAudioUrl } from "@/lib/api";
 
 interface Props {
   type: "user" | "tutor";
@@ -16,7 +16,7 @@ interface Props {
     correction?: string;
     encouragement?: string;
     culturalNote?: string;
-    audioBase64?: string;
+    audioUrl?: string;
   };
   tutorName?: string;
   tutorRegion?: string;
@@ -66,9 +66,9 @@ export default function ChatMessage({
   }, [content.correction]);
 
   const handlePlayAudio = async () => {
-    if (content.audioBase64) {
+    if (content.audioUrl) {
       try {
-        await playAudioBase64(content.audioBase64);
+        await playAudioUrl(content.audioUrl);
       } catch (err) {
         console.error("Audio playback failed:", err);
       }
@@ -156,7 +156,7 @@ export default function ChatMessage({
           )}
 
           {/* Audio play button (tutor only) */}
-          {!isUser && content.audioBase64 && (
+          {!isUser && content.audioUrl && (
             <IconButton
               onClick={handlePlayAudio}
               size="small"
@@ -16,7 +16,7 @@ export interface Message {
     correction?: string;
     encouragement?: string;
     culturalNote?: string;
-    audioBase64?: string;
+    audioUrl?: string;
   };
   tutorName?: string;
   tutorRegion?: string;
@@ -61,7 +61,7 @@ export interface CompleteEvent {
   cultural_note: string;
   response_native: string;
   response_english: string;
-  audio_base64: string;
+  audio_url: string;
   tutor_name: string;
   tutor_region: string;
   language: string;
@@ -96,10 +96,18 @@ export const fetchGreeting = async (
   return data;
 };
 
+// Downloads reply audio once and keeps it as a local object URL, so replays outlive the server copy
+// (the caller owns it and must revoke it)
+export const fetchAudio = async (audioUrl: string): Promise<string> => {
+  const { data } = await api.get(audioUrl, { responseType: "blob" });
+  return URL.createObjectURL(data);
+};
+
 // SSE Handler for conversation
 export type SSEEventHandler = {
   onProgress?: (data: ProgressEvent) => void;
   onTranscript?: (transcript: string) => void;
+  onPartial?: (transcript: string) => void;
   onAnalysis?: (data: AnalysisEvent) => void;
   onTranslation?: (data: TranslationEvent) => void;
   onComplete?: (data: CompleteEvent) => void;
@@ -172,6 +180,9 @@ export const startConversation = (
                   case "transcript":
                     handlers.onTranscript?.(data.transcript);
                     break;
+                  case "partial":
+                    handlers.onPartial?.(data.transcript);
+                    break;
                   case "analysis":
                     handlers.onAnalysis?.(data);
                     break;
@@ -227,6 +238,15 @@ export const startConversation = (
 };
 
 // Audio helpers
+export const playAudioUrl = (url: string): Promise<void> => {
+  return new Promise((resolve, reject) => {
+    const audio = new Audio(url);
+    audio.onended = () => resolve();
+    audio.onerror = () => reject(new Error("Audio playback failed"));
+    audio.play().catch(reject);
+  });
+};
+
 export const playAudioBase64 = (base64: string): Promise<void> => {
   return new Promise((resolve, reject) => {
     try {